@@ -1,83 +1,354 @@
+import asyncio
 import json
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import logging
+import mmap
 import os
-from collections import OrderedDict
+from sortedcontainers import SortedDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _loads(data):
+    """Decode JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj):
+    """Encode an object to indented JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, indent=2, sort_keys=True).encode('utf-8')
+
+
+# O_DIRECT writes must cover whole blocks; a page is a multiple of any logical block size
+_DIRECT_IO_BLOCK = mmap.PAGESIZE
+
+
+def _write_direct(path, data):
+    """
+    Write data to a new file with O_DIRECT, bypassing the page cache.
+    The data is padded with trailing spaces to a whole number of blocks,
+    which keeps JSON content valid.
+
+    :return: True if the file was written, False if O_DIRECT is not supported here.
+    """
+    if not hasattr(os, 'O_DIRECT'):
+        return False
+    size = -(-len(data) // _DIRECT_IO_BLOCK) * _DIRECT_IO_BLOCK
+    # Anonymous mmaps are page aligned, as O_DIRECT requires of the source buffer
+    with mmap.mmap(-1, size) as buffer:
+        buffer.write(data)
+        buffer.write(b' ' * (size - len(data)))
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_DIRECT, 0o644)
+        except OSError:
+            # Filesystems such as tmpfs reject O_DIRECT
+            return False
+        try:
+            written = os.write(fd, buffer)
+        except OSError:
+            return False
+        finally:
+            os.close(fd)
+    return written == size
+
+
+def _dumps_lines(records):
+    """Encode records as compact JSON, one per line, using orjson when it is installed."""
+    if orjson is not None:
+        return b''.join(orjson.dumps(record) + b'\n' for record in records)
+    return ''.join(json.dumps(record) + '\n' for record in records).encode('utf-8')
+
+
+@lru_cache(maxsize=2048)
+def parse_date(date_str):
+    """
+    Parse a 'YYYY-MM-DD' string into a date object.
+    Results are cached since the same dates are parsed over and over.
+    Dates without zero padding, such as '2024-1-5', are accepted as well.
+    Other ISO 8601 forms, such as '20240105' or '2024-W01-1', are rejected.
+
+    :raises ValueError: If the string is not a valid date.
+    """
+    # fromisoformat is the fast path, but on Python 3.11+ it also takes other ISO 8601
+    # forms, so only use it for strings that already have the exact YYYY-MM-DD shape
+    if len(date_str) == 10 and date_str[4] == date_str[7] == '-':
+        try:
+            return date.fromisoformat(date_str)
+        except ValueError:
+            pass
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=32)
+def _exponential_offsets(exponent_base, horizon_days):
+    """
+    Compute the day offsets from the start date at which a topic is repeated.
+    The gap starts at one day and is multiplied by exponent_base after each step;
+    fractional gaps are truncated to whole days.
+
+    :param exponent_base: A number representing the base for the exponential gap.
+    :param horizon_days: An integer representing the last offset that may be returned.
+    :return: A tuple of integer offsets in ascending order, starting with 0.
+    """
+    offsets = []
+    offset = 0
+    gap = 1
+    while offset <= horizon_days:
+        offsets.append(offset)
+        offset += int(gap)
+        gap *= exponent_base
+    return tuple(offsets)
+
 
 class CalendarManager:
-    def __init__(self, db_file='calendar_db.json'):
+    # Rewrite the snapshot once the log grows past this multiple of its size
+    COMPACTION_RATIO = 2
+
+    def __init__(self, db_file='calendar_db.json', log_file=None):
         """
         Initialize the CalendarManager with a database file.
 
+        The database file holds a snapshot of the calendar. Changes made since the
+        snapshot are appended to a log file, one JSON record per line, and folded
+        back into the snapshot once the log gets large.
+
         :param db_file: A string representing the path to the JSON database file.
+        :param log_file: A string representing the path to the change log.
+                         Defaults to db_file with a '.log' extension.
         """
         self.db_file = db_file
-        self.calendar_db = self._load_calendar_db()
+        self.log_file = log_file or os.path.splitext(db_file)[0] + '.log'
+        self._save_lock = asyncio.Lock()
+        self._calendar_db = None
+        # Log records of changes that have not been written to file yet
+        self._pending_ops = []
+        # Set when the log ends in a torn record that must not be appended to
+        self._log_torn = False
+
+    @property
+    def calendar_db(self):
+        """
+        The calendar database as a SortedDict mapping dates to sets of events.
+        It is loaded from the JSON file on first access rather than at startup.
+        """
+        if self._calendar_db is None:
+            self._calendar_db = self._load_calendar_db()
+        return self._calendar_db
 
     def _load_calendar_db(self):
         """
-        Load the calendar database from a JSON file.
-        If the file doesn't exist, return an empty OrderedDict.
-        Dates are sorted in ascending order.
+        Load the calendar database from the JSON snapshot and replay the change log on top.
+        If neither file exists, return an empty SortedDict.
+        Dates are kept sorted in ascending order.
         """
         if os.path.exists(self.db_file):
-            with open(self.db_file, 'r') as file:
+            with open(self.db_file, 'rb') as file:
                 # Load the database and convert string keys back to date objects
-                db = json.load(file)
-                # Sort dates in ascending order
-                sorted_dates = sorted(
-                    (datetime.strptime(date, '%Y-%m-%d').date() for date in db.keys()),
-                    key=lambda x: x
-                )
-                # Create an OrderedDict with sorted dates
-                calendar_db = OrderedDict()
-                for date in sorted_dates:
-                    calendar_db[date] = db[date.isoformat()]
-                return calendar_db
-        return OrderedDict()
+                db = _loads(file.read())
+            # Build the SortedDict in one pass; it sorts the dates once on construction
+            calendar_db = SortedDict((date.fromisoformat(key), set(events)) for key, events in db.items())
+        else:
+            calendar_db = SortedDict()
+
+        if os.path.exists(self.log_file):
+            with open(self.log_file, 'rb') as file:
+                data = file.read()
+            self._log_torn = bool(data) and not data.endswith(b'\n')
+            lines = data.splitlines()
+            for line_number, line in enumerate(lines, start=1):
+                try:
+                    record = _loads(line)
+                except ValueError:
+                    if line_number == len(lines):
+                        # A crash mid-append can leave a torn last line; skip it
+                        # and keep later appends from landing on the same line
+                        self._log_torn = True
+                    else:
+                        logger.warning(f"Skipping malformed record on line {line_number} of {self.log_file}.")
+                    continue
+                self._apply_record(calendar_db, record)
+        return calendar_db
+
+    @staticmethod
+    def _apply_record(calendar_db, record):
+        """
+        Apply a single change log record to the calendar database.
+
+        :param calendar_db: The SortedDict to update.
+        :param record: A dict with an 'op' of 'add' (with 'date' and 'event') or 'cut' (with 'date').
+        """
+        date_obj = date.fromisoformat(record['date'])
+        if record['op'] == 'add':
+            calendar_db.setdefault(date_obj, set()).add(record['event'])
+        elif record['op'] == 'cut':
+            del calendar_db.keys()[:calendar_db.bisect_left(date_obj)]
 
     def _save_calendar_db(self):
         """
-        Save the calendar database to a JSON file.
-        Convert date objects to string keys for JSON serialization.
+        Save pending changes by appending them to the change log.
+        When the log outgrows the snapshot, the whole database is written to the
+        JSON file instead and the log is truncated.
+        If save_async is in flight, the changes stay pending and are written by it
+        once its current write finishes, since writing them now could interleave
+        with its append or land in a log that its compaction is about to remove.
+        """
+        if self._save_lock.locked():
+            return
+        ops, self._pending_ops = self._pending_ops, []
+        try:
+            if self._needs_compaction():
+                self._compact_calendar_db(self._snapshot_calendar_db())
+            elif ops:
+                self._append_log(ops)
+        except Exception:
+            self._restore_pending_ops(ops)
+            raise
+
+    async def save_async(self):
+        """
+        Save pending changes without blocking the event loop.
+        Pending changes, and the snapshot when compacting, are taken on the calling thread,
+        so later mutations cannot race with the encode and write, which run in the default executor.
+        Concurrent saves are serialized so log records are appended in order.
+        Changes made while a write is in flight, including ones deferred by
+        _save_calendar_db, are written before this returns.
         """
-        with open(self.db_file, 'w') as file:
-            # Convert date objects to string keys
-            db = {date.isoformat(): events for date, events in self.calendar_db.items()}
-            json.dump(db, file, indent=4)
+        async with self._save_lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                ops, self._pending_ops = self._pending_ops, []
+                try:
+                    if self._needs_compaction():
+                        db = self._snapshot_calendar_db()
+                        await loop.run_in_executor(None, self._compact_calendar_db, db)
+                    elif ops:
+                        await loop.run_in_executor(None, self._append_log, ops)
+                except Exception:
+                    self._restore_pending_ops(ops)
+                    raise
+                if not self._pending_ops:
+                    break
 
-    def add_event(self, date, event):
+    def _restore_pending_ops(self, ops):
+        """
+        Put back change records after a failed save so they are not lost.
+        The log may now end in a partial record, so the next save rewrites
+        the snapshot from memory instead of appending to it.
+
+        :param ops: The change log records that failed to be written.
+        """
+        self._pending_ops[:0] = ops
+        self._log_torn = True
+
+    def _needs_compaction(self):
+        """
+        Check whether the change log has grown large enough to fold into the snapshot.
+        """
+        if self._log_torn or not os.path.exists(self.db_file):
+            return True
+        if not os.path.exists(self.log_file):
+            return False
+        return os.path.getsize(self.log_file) > self.COMPACTION_RATIO * os.path.getsize(self.db_file)
+
+    def _append_log(self, ops):
+        """
+        Append change records to the log file in a single write.
+
+        :param ops: A list of change log records.
+        """
+        with open(self.log_file, 'ab') as file:
+            file.write(_dumps_lines(ops))
+
+    def _compact_calendar_db(self, db):
+        """
+        Write a full snapshot and truncate the change log it supersedes.
+        Replaying the old log over the new snapshot gives the same result,
+        so a crash between the two steps loses nothing.
+
+        :param db: A dict mapping 'YYYY-MM-DD' strings to lists of events.
+        """
+        self._write_calendar_db(db)
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+        self._log_torn = False
+
+    def _snapshot_calendar_db(self):
+        """
+        Copy the calendar database into a JSON-serializable dict.
+        """
+        # Convert date objects to string keys
+        return {date.isoformat(): sorted(events) for date, events in self.calendar_db.items()}
+
+    def _write_calendar_db(self, db):
+        """
+        Write a snapshot produced by _snapshot_calendar_db to the JSON file.
+
+        :param db: A dict mapping 'YYYY-MM-DD' strings to lists of events.
+        """
+        data = _dumps(db)
+        tmp_file = self.db_file + '.tmp'
+        # Snapshots are large, infrequent writes; keep them out of the page cache where possible
+        if not _write_direct(tmp_file, data):
+            with open(tmp_file, 'wb') as file:
+                file.write(data)
+        os.replace(tmp_file, self.db_file)
+
+    def add_event(self, date, event, defer_save=False):
         """
         Add an event (string) to the calendar database for a specific date.
         Prevents adding the same event to the same date more than once.
-        Maintains the calendar_db in sorted order by date.
+        The SortedDict keeps calendar_db in ascending order by date.
 
         :param date: A string representing the date in 'YYYY-MM-DD' format.
         :param event: A string representing the event to be added.
+        :param defer_save: If True, skip writing the change to file.
+                           The caller is responsible for calling _save_calendar_db.
         :return: A string indicating the result of the operation.
         """
         try:
             # Convert the date string to a datetime object to ensure it's valid
-            date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+            date_obj = parse_date(date)
         except ValueError:
             return "Invalid date format. Please use 'YYYY-MM-DD'."
 
-        # If the date is not in the database, create a new list for it
-        if date_obj not in self.calendar_db:
-            self.calendar_db[date_obj] = []
+        return self._add_event_obj(date_obj, event, defer_save)
 
-        # Check if the event already exists for the given date
-        if event in self.calendar_db[date_obj]:
-            return f"Event '{event}' already exists for {date}. Skipping."
+    def _add_event_obj(self, date_obj, event, defer_save=False):
+        """
+        Add an event to the calendar database for an already parsed date.
+
+        :param date_obj: A date object.
+        :param event: A string representing the event to be added.
+        :param defer_save: If True, skip writing the change to file.
+        :return: A string indicating the result of the operation.
+        """
+        # If the date is not in the database, create a new set for it
+        events = self.calendar_db.get(date_obj)
+        if events is None:
+            events = self.calendar_db[date_obj] = set()
 
-        # Add the event to the list for the given date
-        self.calendar_db[date_obj].append(event)
+        # Check if the event already exists for the given date
+        if event in events:
+            return f"Event '{event}' already exists for {date_obj.isoformat()}. Skipping."
 
-        # Re-sort the calendar_db to maintain ascending order
-        self.calendar_db = OrderedDict(sorted(self.calendar_db.items(), key=lambda x: x[0]))
+        # Add the event to the set for the given date
+        events.add(event)
+        self._pending_ops.append({"op": "add", "date": date_obj.isoformat(), "event": event})
 
         # Save the updated database to file
-        self._save_calendar_db()
-        return f"Event added to {date}: {event}"
+        if not defer_save:
+            self._save_calendar_db()
+        return f"Event added to {date_obj.isoformat()}: {event}"
 
     def show_events(self, date):
         """
@@ -90,15 +361,28 @@ class CalendarManager:
         """
         try:
             # Convert the date string to a datetime object to ensure it's valid
-            date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+            date_obj = parse_date(date)
         except ValueError:
             return "Invalid date format. Please use 'YYYY-MM-DD'.", False
 
+        return self.show_events_obj(date_obj)
+
+    def show_events_obj(self, date_obj):
+        """
+        Display all events for a specific date object.
+
+        :param date_obj: A date object.
+        :return: A tuple containing:
+                 - A string listing the events for the given date.
+                 - A boolean indicating whether there is at least one event on the given date.
+        """
+        date = date_obj.isoformat()
+
         # Check if the date exists in the database
         if date_obj in self.calendar_db:
             events = self.calendar_db[date_obj]
             if events:
-                event_list = "\n".join([f"- {event}" for event in events])
+                event_list = "\n".join(f"- {event}" for event in sorted(events))
                 return f"All topics to remember on {date}:\n{event_list}", True
             else:
                 return f"No events found for {date}.", False
@@ -114,21 +398,22 @@ class CalendarManager:
         """
         try:
             # Convert the cutoff date string to a datetime object to ensure it's valid
-            cutoff_date_obj = datetime.strptime(cutoff_date, '%Y-%m-%d').date()
+            cutoff_date_obj = parse_date(cutoff_date)
         except ValueError:
             return "Invalid date format. Please use 'YYYY-MM-DD'."
 
-        # Create a list of dates to remove
-        dates_to_remove = [date for date in self.calendar_db.keys() if date < cutoff_date_obj]
+        # Dates are sorted, so everything before the cutoff is a prefix of the keys
+        index = self.calendar_db.bisect_left(cutoff_date_obj)
 
-        # Remove the dates from the database
-        for date in dates_to_remove:
-            del self.calendar_db[date]
-
-        self._save_calendar_db()
+        # Nothing to evict, so there is nothing to log
+        if index:
+            # Remove the dates from the database
+            del self.calendar_db.keys()[:index]
+            self._pending_ops.append({"op": "cut", "date": cutoff_date_obj.isoformat()})
+            self._save_calendar_db()
         return f"Removed all events before {cutoff_date}."
 
-    def add_multiple(self, event, exponent_base=2, start_date=None):
+    def add_multiple(self, event, exponent_base=2, start_date=None, defer_save=False):
         """
         Add an event to multiple dates with an exponentially growing gap between dates.
 
@@ -137,6 +422,8 @@ class CalendarManager:
                               Defaults to 2.
         :param start_date: A string representing the start date in 'YYYY-MM-DD' format.
                            If not provided, the current date is used.
+        :param defer_save: If True, skip writing the changes to file.
+                           The caller is responsible for calling save_async or _save_calendar_db.
         :return: A string indicating the result of the operation.
         """
         if start_date is None:
@@ -145,24 +432,22 @@ class CalendarManager:
         else:
             try:
                 # Convert the start date string to a datetime object to ensure it's valid
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
+                start_date_obj = parse_date(start_date)
             except ValueError:
                 return "Invalid start date format. Please use 'YYYY-MM-DD'."
 
-        # Calculate the end date (30 years from the start date)
-        end_date_obj = start_date_obj + timedelta(days=365 * 30)
-
-        # Initialize the gap
-        gap = 1
+        # Bind loop lookups to locals once instead of resolving them on every iteration
+        _td = timedelta
+        add_event_obj = self._add_event_obj
 
         # Add the event to dates with exponentially growing gaps
-        current_date_obj = start_date_obj
         output = []
-        while current_date_obj <= end_date_obj:
-            result = self.add_event(current_date_obj.isoformat(), event)
+        for offset in _exponential_offsets(exponent_base, 365 * 30):
+            current_date_obj = start_date_obj + _td(days=offset)
+            result = add_event_obj(current_date_obj, event, defer_save=True)
             output.append(result)
-            # Increment the gap exponentially using the provided base
-            current_date_obj += timedelta(days=gap)
-            gap *= exponent_base
 
+        # Write the database once for the whole batch
+        if not defer_save:
+            self._save_calendar_db()
         return "\n".join(output)
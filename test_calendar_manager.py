@@ -0,0 +1,142 @@
+import asyncio
+import errno
+from datetime import date
+import os
+import random
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from calendar_manager import CalendarManager
+
+
+def _fail_with_enospc(*args, **kwargs):
+    raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+
+def _torn_append(manager, ops):
+    """Write half of a record to the log, then fail as if the disk filled up."""
+    with open(manager.log_file, 'ab') as file:
+        file.write(b'{"op":"add","da')
+    _fail_with_enospc()
+
+
+class CalendarManagerLogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.db_file = os.path.join(self.tmp_dir.name, 'calendar_db.json')
+
+    def reload(self):
+        return dict(CalendarManager(self.db_file).calendar_db)
+
+    def assertPersisted(self, manager):
+        self.assertEqual(self.reload(), dict(manager.calendar_db))
+
+    def test_random_operations_survive_reload(self):
+        rng = random.Random(1234)
+        manager = CalendarManager(self.db_file)
+
+        async def run():
+            for step in range(200):
+                day = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                choice = rng.random()
+                if choice < 0.45:
+                    manager.add_event(day, f"event {rng.randint(0, 5)}")
+                elif choice < 0.6:
+                    manager.add_multiple(f"topic {step}", rng.choice([1.5, 2, 3]), day, defer_save=True)
+                    await manager.save_async()
+                elif choice < 0.75:
+                    manager.cut_events_before_date(f"2025-{rng.randint(1, 6):02d}-01")
+                else:
+                    # Fail the write, either cleanly or leaving a torn line, then retry
+                    failure = rng.choice([_fail_with_enospc, _torn_append])
+                    with mock.patch.object(CalendarManager, '_append_log', failure), \
+                            mock.patch.object(CalendarManager, '_write_calendar_db', _fail_with_enospc):
+                        with self.assertRaises(OSError):
+                            manager.add_event(day, f"failed {step}")
+                    manager._save_calendar_db()
+                self.assertPersisted(manager)
+
+        asyncio.run(run())
+
+    def test_torn_tail_is_skipped_and_not_appended_to(self):
+        manager = CalendarManager(self.db_file)
+        manager.add_event('2025-01-01', 'first')
+        manager.add_event('2025-01-02', 'second')
+        with open(manager.log_file, 'ab') as file:
+            file.write(b'{"op":"add","date":"2025-01-0')
+
+        reloaded = CalendarManager(self.db_file)
+        self.assertEqual(dict(reloaded.calendar_db), dict(manager.calendar_db))
+        reloaded.add_event('2025-01-03', 'third')
+        self.assertPersisted(reloaded)
+
+    def test_malformed_middle_line_is_reported(self):
+        manager = CalendarManager(self.db_file)
+        manager.add_event('2025-01-01', 'first')
+        with open(manager.log_file, 'ab') as file:
+            file.write(b'not json\n')
+        manager.add_event('2025-01-02', 'second')
+
+        with self.assertLogs('calendar_manager', level='WARNING'):
+            reloaded = self.reload()
+        self.assertEqual(reloaded, dict(manager.calendar_db))
+
+    def test_failed_append_is_retried_on_next_save(self):
+        manager = CalendarManager(self.db_file)
+        manager.add_event('2025-01-01', 'seed')
+        manager.add_event('2025-01-02', 'seed')
+
+        with mock.patch.object(CalendarManager, '_append_log', _torn_append):
+            with self.assertRaises(OSError):
+                manager.add_event('2025-01-03', 'lost')
+        self.assertIn('already exists', manager.add_event('2025-01-03', 'lost'))
+        manager.add_event('2025-01-04', 'other')
+
+        self.assertIn('lost', self.reload()[date(2025, 1, 3)])
+        self.assertPersisted(manager)
+
+    def test_failed_async_save_is_retried(self):
+        manager = CalendarManager(self.db_file)
+        manager.add_event('2025-01-01', 'seed')
+
+        async def run():
+            manager.add_multiple('bulk', 3, '2026-01-01', defer_save=True)
+            with mock.patch.object(CalendarManager, '_append_log', _torn_append):
+                with self.assertRaises(OSError):
+                    await manager.save_async()
+            await manager.save_async()
+
+        asyncio.run(run())
+        self.assertPersisted(manager)
+
+    def test_sync_save_during_async_compaction(self):
+        manager = CalendarManager(self.db_file)
+        manager.add_event('2025-01-01', 'seed')
+        compact = CalendarManager._compact_calendar_db
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_compact(self, db):
+            started.set()
+            release.wait(timeout=5)
+            compact(self, db)
+
+        async def run():
+            manager.add_event('2025-02-01', 'async', defer_save=True)
+            manager._log_torn = True  # force the next save to compact
+            with mock.patch.object(CalendarManager, '_compact_calendar_db', slow_compact):
+                task = asyncio.create_task(manager.save_async())
+                await asyncio.get_running_loop().run_in_executor(None, started.wait)
+                manager.add_event('2025-03-01', 'during')
+                release.set()
+                await task
+
+        asyncio.run(run())
+        self.assertPersisted(manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
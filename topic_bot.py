@@ -1,11 +1,12 @@
+import asyncio
 import logging
 import json
-from datetime import time, datetime
+from datetime import time, date
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from calendar_manager import CalendarManager 
+from calendar_manager import CalendarManager, parse_date
 
 # Enable logging
 logging.basicConfig(format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO)
@@ -19,10 +20,6 @@ CONFIG_FILE = "config.json"
 # Global scheduler
 scheduler = AsyncIOScheduler()
 
-# Global variables for /add command
-topic = None
-exponent_base = None
-
 # Initialize CalendarManager
 calendar_db = CalendarManager()
 
@@ -54,29 +51,34 @@ def save_config(bot_token: str, chat_id: int, user_id: int, default_time: time):
         "DEFAULT_TIME": {"hour": default_time.hour, "minute": default_time.minute},
     }
     with open(CONFIG_FILE, "w") as file:
-        json.dump(config, file, indent=4)
+        file.write(json.dumps(config, indent=4))
+
+async def save_config_async(bot_token: str, chat_id: int, user_id: int, default_time: time):
+    """Save configurations to the JSON file without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, save_config, bot_token, chat_id, user_id, default_time)
 
-async def remind_topic(app: Application, date: str = None):
+async def remind_topic(app: Application, date_str: str = None):
     """Remind me of a topic every day at a given time."""
     # Use the provided date or the current date if none is provided
     if not verify_user(update.effective_user.id):
         await update.message.reply_text("You are not authorized to use this bot.")
         return
     
-    if date:
+    current_date = None
+    if date_str:
         try:
             # Validate the date format (yyyy-mm-dd)
-            datetime.strptime(date, "%Y-%m-%d")
-            current_date = date
+            current_date = parse_date(date_str)
         except ValueError:
-            # If the date is invalid, use the current date
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            logger.warning(f"Invalid date format '{date}'. Using current date instead.")
-    else:
-        current_date = datetime.now().strftime("%Y-%m-%d")
+            logger.warning(f"Invalid date format '{date_str}'. Using current date instead.")
+
+    # Fall back to the current date, looked up only when it is actually needed
+    if current_date is None:
+        current_date = date.today()
 
     # Get the text and is_event flag from the calendar manager
-    text_event , is_event = calendar_db.show_events(current_date)
+    text_event , is_event = calendar_db.show_events_obj(current_date)
 
     # Send the message only if there is an event
     if is_event:
@@ -131,7 +133,7 @@ async def set_time(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
         # Save the new default time to the config file
-        save_config(BOT_TOKEN, CHAT_ID, new_time_obj)
+        await save_config_async(BOT_TOKEN, CHAT_ID, USER_ID, new_time_obj)
 
         await update.message.reply_text(f"Reminder time updated successfully! New time: {new_time_obj.strftime('%H:%M')} UTC")
     except ValueError as e:
@@ -146,8 +148,6 @@ async def add(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     """Add a topic and an exponent base."""
-    global topic, exponent_base
-
     try:
         # Check if at least one argument is provided
         if len(context.args) < 1:
@@ -167,7 +167,8 @@ async def add(update: Update, context: ContextTypes.DEFAULT_TYPE):
             topic = " ".join(context.args[:-1])  # All arguments except the last are part of the topic
 
         # Add the topic and exponent base to the calendar manager
-        result = calendar_db.add_multiple(topic, exponent_base)
+        result = calendar_db.add_multiple(topic, exponent_base, defer_save=True)
+        await calendar_db.save_async()
 
         # Send the result to the user
         await update.message.reply_text(result)